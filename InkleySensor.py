@@ -14,12 +14,15 @@ Inkley_SensorCommander (Python CLI)
     * Writes a CSV with columns: Timestamp, Pressure1, Pressure2
     * Supports high-rate “packed” broadcast frames on CAN ID 0x7DF (frame_type=0x05, sensor_id=0x12)
       where Pressure1/Pressure2 are 12-bit ADC counts packed into bytes [2..5].
+    * One row per received sample; nothing is written while no new samples arrive
+      (no repeated snapshot rows while idle).
     * Flushes periodically to reduce data loss risk.
 - Protocol notes:
     * Commands are sent TO the module at CAN ID 0x107.
     * The module returns ACK/response frames to PC_RESP_ID (default 0x108), included in the command payload.
 - Typical usage:
-    1) scan_ports   (or set_channel COMx)
+    1) scan_ports   (or set_channel COMx; the choice is remembered in ~/.inkley_port,
+                     run with --scan to pick again at launch)
     2) set_outdir   <path>     (optional)
     3) set_filename <file.csv> (optional)
     4) start        (real-time logging)  /  stop
@@ -33,22 +36,148 @@ Last updated: 2026-02-16
 """
 
 import can
-import csv
 import datetime
 import struct
+from array import array
 import cmd
 import threading
+import queue
 import platform
 import serial.tools.list_ports
 import os
+import sys
+import re
+import time
+import gc
+import ctypes
+import functools
+from dataclasses import dataclass
 from pathlib import Path
+from can.exceptions import error_check
+from can.interfaces.slcan import slcanBus
+
+# Last port chosen via scan_ports/set_channel, reused on the next launch
+_PORT_CFG = Path.home() / '.inkley_port'
+
+def _load_saved_port():
+    """Return the port saved by a previous session, or None"""
+    try:
+        return _PORT_CFG.read_text().strip() or None
+    except OSError:
+        return None
+
+def _save_port(port):
+    """Remember the selected port for the next launch (best-effort)"""
+    try:
+        _PORT_CFG.write_text(f"{port}\n")
+    except OSError as e:
+        print(f"Could not save port to {_PORT_CFG}: {e}")
 
 # Global configuration
-CAN_CHANNEL = 'COM5'
+CAN_CHANNEL = _load_saved_port() or 'COM5'
 
 # NEW: the CAN ID PC/listener will receive ACK responses on
 PC_RESP_ID = 0x108
 
+# CAN ID the module broadcasts real-time samples on
+BROADCAST_ID = 0x7DF
+
+# Only the broadcast and response IDs are of interest; everything else is
+# dropped by the driver before it reaches the stream loop.
+CAN_RX_FILTERS = [
+    {'can_id': BROADCAST_ID, 'can_mask': 0x7FF, 'extended': False},
+    {'can_id': PC_RESP_ID, 'can_mask': 0x7FF, 'extended': False},
+]
+
+# CSV header for logged samples. Streamed logs and read_flash files both end
+# rows with '\r\n' (the csv module's default dialect).
+CSV_HEADER = b'Timestamp,Pressure1,Pressure2\r\n'
+
+# Host details don't change while the tool runs; look them up once
+_PLATFORM = platform.platform()
+_PYV = platform.python_version()
+
+# Precompiled decoder for the big-endian u32 carried in bytes [4..7] of a frame
+_U32_BE = struct.Struct('>I')
+# Firmware version ACK: major, minor, patch, build in bytes [4..7]
+_VERSION_BYTES = struct.Struct('>4x4B')
+# Command frame sent to the module: cmd, response CAN ID, u32 value, trailing 0
+_CMD_FRAME = struct.Struct('>BHIB')
+
+# Preformatted decimal strings for 12-bit ADC counts and for the millisecond
+# field of CSV timestamps, so rendering a row is table lookups instead of
+# int-to-decimal conversions
+_DEC = tuple(map(str, range(4096)))
+_MS3 = tuple('%03d' % i for i in range(1000))
+
+# Legacy packed broadcast frame (type 0x05): Pressure1, Pressure2 as big-endian
+# u16 in bytes [2..5], after the frame_type/sensor_id bytes
+_PACKED_P1P2 = struct.Struct('>xxHHxx')
+# Dual-sample broadcast frame (type 0x06): the 48 bits in bytes [2..7] read as a
+# u16 (bytes 2-3) and a u32 (bytes 4-7) in one C call
+_PACKED_2X = struct.Struct('>xxHI')
+# Flash playback frame: Pressure1, Pressure2 as big-endian u16 in bytes [4..7]
+_FLASH_SAMPLE = struct.Struct('>4xHH')
+
+def _write_all(fd, data):
+    """os.write() data to fd in full; a single call may accept only part of a large buffer."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def _writev_all(fd, buffers):
+    """Write a list of buffers in order, with one os.writev() call where available (no join copy)."""
+    if not hasattr(os, 'writev'):   # e.g. Windows
+        _write_all(fd, b''.join(buffers))
+        return
+    written = os.writev(fd, buffers)
+    # Finish whatever a short writev() left behind
+    for buf in buffers:
+        if written >= len(buf):
+            written -= len(buf)
+            continue
+        _write_all(fd, memoryview(buf)[written:])
+        written = 0
+
+def _slcan_bulk_read(self, timeout):
+    """Replacement for slcanBus._read that drains the serial port in bulk.
+
+    The stock driver reads one byte per call (one syscall + up to 1 ms serial
+    timeout each, ~27 per frame). Here everything waiting is read at once into
+    the driver's persistent buffer and the first CR/BEL-terminated record is
+    sliced off and returned. Serial errors surface as CanOperationError, as
+    with the stock implementation.
+    """
+    buf = self._buffer
+    ser = self.serialPortOrig
+    deadline = None if timeout is None else time.monotonic() + timeout
+    read_once = False
+    with error_check("Could not read from serial device"):
+        while True:
+            end = buf.find(b'\r')
+            err = buf.find(b'\a')
+            if err >= 0 and (end < 0 or err < end):
+                end = err
+            if end >= 0:
+                record = buf[:end + 1].decode()
+                del buf[:end + 1]
+                return record
+
+            # Checked on every pass (after at least one read), so a steady byte
+            # stream without a terminator still times out; partial data stays
+            # buffered for the next call
+            if read_once and deadline is not None and time.monotonic() >= deadline:
+                return None
+            read_once = True
+
+            chunk = ser.read(ser.in_waiting or 1)
+            if chunk:
+                buf += chunk
+
+# Patch the slcan driver so every bus opened below uses the bulk reader
+slcanBus._read = _slcan_bulk_read
+
+@functools.lru_cache(maxsize=None)
 def detect_os():
     """Detect the current operating system"""
     system = platform.system().lower()
@@ -61,71 +190,125 @@ def detect_os():
     else:
         return f'Unknown ({system})'
 
-def scan_can_ports():
-    """Scan for available CAN interface serial ports (CANdo/CANable devices)"""
+def boost_current_thread(cpu=None, rt_priority=None):
+    """Best-effort: raise the calling thread's priority and optionally pin it to one CPU core.
+    On Linux, rt_priority (1-99) switches the thread to SCHED_FIFO instead of renicing it.
+    """
+    system = detect_os()
+    try:
+        if system == 'Windows':
+            kernel32 = ctypes.windll.kernel32
+            thread = kernel32.GetCurrentThread()
+            kernel32.SetThreadPriority(thread, 2)  # THREAD_PRIORITY_HIGHEST
+            if cpu is not None:
+                kernel32.SetThreadAffinityMask(thread, 1 << cpu)
+        elif system == 'Linux':
+            if cpu is not None:
+                os.sched_setaffinity(0, {cpu})  # pid 0 = calling thread on Linux
+            if rt_priority is not None:
+                # Real-time FIFO class; needs CAP_SYS_NICE or an rtprio limit
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(rt_priority))
+            else:
+                os.nice(-5)  # per-thread on Linux; needs CAP_SYS_NICE
+    except (OSError, AttributeError) as e:
+        print(f"Could not raise stream thread priority/affinity: {e}")
+
+# Common identifiers for CAN interfaces (matched against description/manufacturer/serial)
+_CAN_IDENTIFIERS = (
+    'canable',
+    'cando',
+    'slcan',
+    'can',
+    'cantact',
+    'usb2can',
+    'peak',
+    'kvaser',
+)
+# Only identifiers not already containing a shorter one go into the pattern
+# ('can' covers canable/cando/slcan/...), so the search tries fewer branches
+_CAN_ID_RE = re.compile('|'.join(
+    re.escape(i) for i in _CAN_IDENTIFIERS
+    if not any(o != i and o in i for o in _CAN_IDENTIFIERS)), re.IGNORECASE)
+
+# Common CAN device VID/PIDs
+_CAN_VID_PIDS = frozenset({
+    '1D50:606F',  # CANable
+    '16C0:27DD',  # CANtact
+    '0483:5740',  # STM32 (common for CAN devices)
+})
+
+# Cache for scan_can_ports(): comports() enumeration is slow on Windows
+# (WMI/SetupAPI), and system_info/scan_ports are often run back-to-back.
+_PORT_CACHE = {'ts': 0.0, 'ports': None}
+_PORT_CACHE_TTL_S = 5.0
+
+@dataclass(slots=True)
+class PortInfo:
+    """One serial port as reported by scan_can_ports()"""
+    device: str
+    description: str
+    manufacturer: str
+    vid_pid: str          # 'VVVV:PPPP', or '' when the port has no USB IDs
+    serial_number: str
+    is_can_device: bool
+
+def scan_can_ports(invalidate=False):
+    """Scan for available CAN interface serial ports (CANdo/CANable devices).
+    Results are reused for _PORT_CACHE_TTL_S seconds; pass invalidate=True to force a fresh scan.
+    """
+    if (not invalidate and _PORT_CACHE['ports'] is not None
+            and time.monotonic() - _PORT_CACHE['ts'] < _PORT_CACHE_TTL_S):
+        return _PORT_CACHE['ports']
+
     ports = []
     available_ports = serial.tools.list_ports.comports()
     
-    # Common identifiers for CAN interfaces
-    can_identifiers = [
-        'canable',
-        'cando', 
-        'slcan',
-        'can',
-        'cantact',
-        'usb2can',
-        'peak',
-        'kvaser'
-    ]
-    
     for port in available_ports:
-        port_info = {
-            'device': port.device,
-            'description': port.description or '',
-            'manufacturer': port.manufacturer or '',
-            'vid_pid': f"{port.vid:04X}:{port.pid:04X}" if port.vid and port.pid else '',
-            'serial_number': port.serial_number or '',
-            'is_can_device': False
-        }
-        
-        # Check if this might be a CAN device based on description, manufacturer, or VID/PID
-        search_text = f"{port_info['description']} {port_info['manufacturer']} {port_info['serial_number']}".lower()
-        
-        for identifier in can_identifiers:
-            if identifier in search_text:
-                port_info['is_can_device'] = True
-                break
-        
-        # Also check for common CAN device VID/PIDs
-        can_vid_pids = [
-            '1D50:606F',  # CANable
-            '16C0:27DD',  # CANtact
-            '0483:5740',  # STM32 (common for CAN devices)
-        ]
-        
-        if port_info['vid_pid'] in can_vid_pids:
-            port_info['is_can_device'] = True
-            
-        ports.append(port_info)
+        description = port.description or ''
+        manufacturer = port.manufacturer or ''
+        serial_number = port.serial_number or ''
+        vid_pid = f"{port.vid:04X}:{port.pid:04X}" if port.vid and port.pid else ''
+
+        # Known CAN VID/PIDs identify the device outright; only other ports need
+        # the keyword search over description, manufacturer, and serial number
+        is_can_device = (vid_pid in _CAN_VID_PIDS
+                         or _CAN_ID_RE.search(f"{description} {manufacturer} {serial_number}") is not None)
+
+        ports.append(PortInfo(port.device, description, manufacturer, vid_pid,
+                              serial_number, is_can_device))
     
+    # Known CAN adapters first; the sort is stable, so each group keeps the OS
+    # enumeration order (and the menu numbers users are used to)
+    ports.sort(key=lambda p: p.vid_pid not in _CAN_VID_PIDS)
+    _PORT_CACHE['ports'] = ports
+    _PORT_CACHE['ts'] = time.monotonic()
     return ports
 
-def select_can_port():
-    """Interactive port selection for CAN interface"""
+def select_can_port(auto=False, rescan=False):
+    """Interactive port selection for CAN interface.
+    With auto=True, a single detected CAN device is selected without prompting.
+    With rescan=True, the port list is re-enumerated instead of taken from the scan cache.
+    """
     global CAN_CHANNEL
     
     print(f"\nDetected OS: {detect_os()}")
     print("Scanning for available serial ports...")
     
-    ports = scan_can_ports()
+    ports = scan_can_ports(invalidate=rescan)
     
     if not ports:
         print("No serial ports found!")
         return None
     
     # Separate CAN devices from other ports
-    can_ports = [p for p in ports if p['is_can_device']]
-    other_ports = [p for p in ports if not p['is_can_device']]
+    can_ports = [p for p in ports if p.is_can_device]
+    other_ports = [p for p in ports if not p.is_can_device]
+
+    if auto and len(can_ports) == 1:
+        CAN_CHANNEL = can_ports[0].device
+        print(f"Auto-selected CAN device: {CAN_CHANNEL} ({can_ports[0].description})")
+        _save_port(CAN_CHANNEL)
+        return CAN_CHANNEL
     
     print("\n" + "="*80)
     print("AVAILABLE SERIAL PORTS")
@@ -138,14 +321,14 @@ def select_can_port():
         print("\nLikely CAN Interface Devices:")
         print("-" * 40)
         for port in can_ports:
-            print(f"  {option_num}. {port['device']}")
-            print(f"     Description: {port['description']}")
-            if port['manufacturer']:
-                print(f"     Manufacturer: {port['manufacturer']}")
-            if port['vid_pid'] != ':':
-                print(f"     VID:PID: {port['vid_pid']}")
-            if port['serial_number']:
-                print(f"     Serial: {port['serial_number']}")
+            print(f"  {option_num}. {port.device}")
+            print(f"     Description: {port.description}")
+            if port.manufacturer:
+                print(f"     Manufacturer: {port.manufacturer}")
+            if port.vid_pid:
+                print(f"     VID:PID: {port.vid_pid}")
+            if port.serial_number:
+                print(f"     Serial: {port.serial_number}")
             print()
             port_options.append(port)
             option_num += 1
@@ -154,12 +337,12 @@ def select_can_port():
         print("Other Serial Ports:")
         print("-" * 40)
         for port in other_ports:
-            print(f"  {option_num}. {port['device']}")
-            print(f"     Description: {port['description']}")
-            if port['manufacturer']:
-                print(f"     Manufacturer: {port['manufacturer']}")
-            if port['vid_pid'] != ':':
-                print(f"     VID:PID: {port['vid_pid']}")
+            print(f"  {option_num}. {port.device}")
+            print(f"     Description: {port.description}")
+            if port.manufacturer:
+                print(f"     Manufacturer: {port.manufacturer}")
+            if port.vid_pid:
+                print(f"     VID:PID: {port.vid_pid}")
             print()
             port_options.append(port)
             option_num += 1
@@ -178,8 +361,9 @@ def select_can_port():
             
             if 1 <= choice_num <= len(port_options):
                 selected_port = port_options[choice_num - 1]
-                CAN_CHANNEL = selected_port['device']
+                CAN_CHANNEL = selected_port.device
                 print(f"Selected port: {CAN_CHANNEL}")
+                _save_port(CAN_CHANNEL)
                 return CAN_CHANNEL
             elif choice_num == option_num:
                 # Manual entry
@@ -187,6 +371,7 @@ def select_can_port():
                 if custom_port:
                     CAN_CHANNEL = custom_port
                     print(f"Using custom port: {CAN_CHANNEL}")
+                    _save_port(CAN_CHANNEL)
                     return CAN_CHANNEL
             elif choice_num == option_num + 1:
                 # Skip selection
@@ -201,6 +386,16 @@ def select_can_port():
             print("\nPort selection cancelled.")
             return None
 
+class _ResponseListener(can.Listener):
+    """Passes ACK frames addressed to PC_RESP_ID to a callback (runs on the Notifier thread)."""
+
+    def __init__(self, on_response):
+        self.on_response = on_response
+
+    def on_message_received(self, msg):
+        if msg.arbitration_id == PC_RESP_ID and len(msg.data) == 8:
+            self.on_response(msg.data)
+
 class CANBusCommander(cmd.Cmd):
     intro = """Inkley Sensor Command Line Interface. Type 'help' for commands.\n
 Inkley Sensor CLI Menu:
@@ -221,6 +416,8 @@ Additional commands:
   set_filename     - Set CSV filename for logging
   set_buffer_size  - Set the RAM buffer size (samples) used while streaming
   read_flash       - Download stored flash data and save to CSV
+  set_affinity     - Pin the streaming thread to a CPU core
+  poll_readings    - Request readings periodically (poll_readings <s> | stop)
 """
     prompt = "> "
     
@@ -238,9 +435,23 @@ Additional commands:
 
     def __init__(self):
         super().__init__()
+        # Bound handlers for the numbered menu, resolved once
+        self._dispatch = {num: getattr(self, f'do_{name}') for num, name in self.COMMAND_MAP.items()}
         self.bus = None
-        self.streaming = False
+        self._bus_channel = None   # channel self.bus was opened on
+        # Set while no stream is running; do_start clears it and _stop_stream sets
+        # it and wakes the stream thread through its reader
+        self._stop_evt = threading.Event()
+        self._stop_evt.set()
         self.stream_thread = None
+        self._stream_reader = None   # BufferedReader feeding the active stream thread
+        self.stream_cpu = None     # CPU core to pin the stream thread to (None = any)
+        self.stream_rt_priority = None   # Linux SCHED_FIFO priority for the stream thread (None = renice only)
+        # Periodic readings request (poll_readings): the thread sends through
+        # send_command so it shares bus_lock and TX pacing; its event is set to stop it
+        self._poll_thread = None
+        self._poll_stop = threading.Event()
+        self._poll_stop.set()
 
         # --- Output file settings ---
         self.output_dir = Path.cwd() / "Data"     # default folder: ./Data
@@ -252,19 +463,27 @@ Additional commands:
         else:
             print("No CAN channel configured. Use 'scan_ports' (option 6) or 'set_channel' to configure a port.")
 
-        # Latest-known values + timestamps for deterministic logging
-        self.sensor_data = {
-            'Pressure1': None,
-            'Pressure2': None,
-        }
-        self.sensor_time = {
-            'Pressure1': None,
-            'Pressure2': None,
-        }
+        # Latest-known values + timestamps, published by the stream thread as one
+        # immutable tuple: (value per channel..., perf_counter_ns time per channel...),
+        # channels in SENSOR_NAMES order. Only the stream thread writes it and
+        # replacing the reference is atomic, so readers take a consistent snapshot
+        # without a lock.
+        self.SENSOR_NAMES = ('Pressure1', 'Pressure2')
+        self._latest = (None,) * (2 * len(self.SENSOR_NAMES))
+        self.stale_after_s = 2.0   # readings older than this are flagged by 'readings'
 
         # Locks / synchronization for CAN bus access + response handling
-        self.bus_lock = threading.Lock()          # Protects access to self.bus (send/recv/shutdown)
-        self.data_lock = threading.Lock()         # Protects sensor_data/sensor_time
+        self.bus_lock = threading.Lock()          # Protects access to self.bus (send/recv/shutdown);
+                                                  # while streaming, recv belongs to the stream Notifier
+
+        # TX pacing: minimum spacing between outgoing frames so scripted bursts
+        # don't overrun the SLCAN adapter (~one max-length standard frame at 1 Mbit/s)
+        self.tx_min_gap_s = 130e-6
+
+        # bus.recv timeout for the stream Notifier thread; bounds how long
+        # notifier.stop() waits on an idle bus
+        self.stream_recv_timeout_s = 0.05
+        self._next_tx_time = 0.0
 
         # Response handling (used when streaming is active)
         self.expected_response_cmd = None
@@ -279,6 +498,12 @@ Additional commands:
             #0x03: 'Temperature1',
             #0x04: 'Temperature2'
         }
+        # sensor_id byte -> channel index (SENSOR_NAMES order), -1 for unknown ids. A full
+        # 256-entry table so validity + index is one sequence fetch, no hashing.
+        self._sensor_index = tuple(
+            self.SENSOR_NAMES.index(self.SENSOR_IDS[sid]) if sid in self.SENSOR_IDS else -1
+            for sid in range(256)
+        )
         # Command IDs for sending to the sensor module
         self.CMD_VERSION = 0x01
         self.CMD_START_STREAM = 0x02
@@ -287,14 +512,46 @@ Additional commands:
         self.CMD_GET_READINGS = 0x05
         self.CMD_STREAM_BUFFER_SET = 0x06
         self.CMD_READ_FLASH = 0x07
+
+        # Response decoders keyed by the command id echoed in byte [3] of an ACK;
+        # anything not listed is reported as a generic status/value ACK.
+        self._response_handlers = {
+            self.CMD_VERSION: self._handle_version_response,
+            self.CMD_GET_READINGS: self._handle_readings_ack,
+        }
+
+        # Frames for commands sent without a value never change; build them once
+        self._cmd_msgs = {
+            cid: can.Message(
+                arbitration_id=self.CAN_ID,
+                data=self._command_payload(cid),
+                is_extended_id=False
+            )
+            for cid in (self.CMD_VERSION, self.CMD_START_STREAM, self.CMD_STREAM_BUFFER,
+                        self.CMD_STOP_STREAM, self.CMD_GET_READINGS, self.CMD_READ_FLASH)
+        }
         
         self.version = "1.0.0"
         
+    @property
+    def streaming(self):
+        """True between a successful start and the matching stop"""
+        return not self._stop_evt.is_set()
+
     def initialize_can_bus(self):
-        """Initialize the CAN bus if not already initialized"""
+        """Initialize the CAN bus if not already initialized.
+        The bus stays open for the program's lifetime and is only reopened when CAN_CHANNEL changes.
+        """
         with self.bus_lock:
             if self.bus is not None:
-                return True
+                if self._bus_channel == CAN_CHANNEL:
+                    return True
+                # Channel changed since the bus was opened: reconnect on the new one
+                # (readings polling was aimed at the old module; it stops on its own)
+                self._poll_stop.set()
+                self.bus.shutdown()
+                self.bus = None
+                self._bus_channel = None
 
             if CAN_CHANNEL is None:
                 print("No CAN channel configured. Use 'scan_ports' or 'set_channel' to configure a port.")
@@ -302,13 +559,22 @@ Additional commands:
             try:
                 # Use the global CAN_CHANNEL variable
                 # NOTE: Use 1 Mbps for high-rate sampling (matches the MCU firmware)
-                self.bus = can.interface.Bus(interface='slcan', channel=CAN_CHANNEL, bitrate=1000000)
+                self.bus = can.interface.Bus(interface='slcan', channel=CAN_CHANNEL, bitrate=1000000,
+                                             can_filters=CAN_RX_FILTERS)
+                self._bus_channel = CAN_CHANNEL
                 print(f"CAN bus initialized successfully on {CAN_CHANNEL}")
                 return True
             except Exception as e:
                 print(f"Error initializing CAN bus on {CAN_CHANNEL}: {e}")
+                print("Use 'scan_ports' (option 6) or 'set_channel' to pick another port.")
                 return False
         
+    @staticmethod
+    def _command_payload(command_id, value_u32=None):
+        """Return the 8-byte command payload as a single bytes object (see send_command)."""
+        value = 0 if value_u32 is None else int(value_u32) & 0xFFFFFFFF
+        return _CMD_FRAME.pack(command_id, PC_RESP_ID, value, 0)
+
     def send_command(self, command_id, value_u32=None):
         """Send a command to the sensor module via CAN bus.
         Payload format (matches Tiva main.c):
@@ -317,28 +583,20 @@ Additional commands:
         if not self.initialize_can_bus():
             return False
 
-        resp_hi = (PC_RESP_ID >> 8) & 0xFF
-        resp_lo = (PC_RESP_ID >> 0) & 0xFF
-
-        if value_u32 is None:
-            b3 = b4 = b5 = b6 = 0
-        else:
-            value_u32 = int(value_u32) & 0xFFFFFFFF
-            b3 = (value_u32 >> 24) & 0xFF
-            b4 = (value_u32 >> 16) & 0xFF
-            b5 = (value_u32 >>  8) & 0xFF
-            b6 = (value_u32 >>  0) & 0xFF
-
-        message_data = [command_id, resp_hi, resp_lo, b3, b4, b5, b6, 0x00]
-
         try:
-            msg = can.Message(
-                arbitration_id=self.CAN_ID,   # send TO the module (0x107)
-                data=message_data,
-                is_extended_id=False
-            )
+            msg = self._cmd_msgs.get(command_id) if value_u32 is None else None
+            if msg is None:
+                msg = can.Message(
+                    arbitration_id=self.CAN_ID,   # send TO the module (0x107)
+                    data=self._command_payload(command_id, value_u32),
+                    is_extended_id=False
+                )
             with self.bus_lock:
+                wait = self._next_tx_time - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
                 self.bus.send(msg)
+                self._next_tx_time = time.monotonic() + self.tx_min_gap_s
             return True
         except Exception as e:
             print(f"Error sending command {hex(command_id)}: {e}")
@@ -381,236 +639,427 @@ Additional commands:
         self.csv_file = filename
         print(f"Output set to: {(self.output_dir / self.csv_file).resolve()}")
 
-    def _make_output_path(self) -> Path:
-        """Return full output path; ensure directory exists."""
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        return self.output_dir / self.csv_file
+    def _discard_pending_frames(self):
+        """Drop frames buffered while nobody was reading the bus.
 
-    def stream_data(self):
-        # Initialize CAN bus interface for CANable
+        The bus stays open between commands, so late broadcasts after 'stop' and
+        earlier ACKs may still be queued. Call this before attaching a new reader
+        so they are neither replayed into a session nor mistaken for a reply.
+        """
+        discarded = 0
+        drain_deadline = time.monotonic() + 1.0
+        while time.monotonic() < drain_deadline and self.bus.recv(0) is not None:
+            discarded += 1
+        if discarded:
+            print(f"Discarded {discarded} stale frame(s)")
+
+    def _make_output_path(self, tag=None) -> Path:
+        """Return full output path; ensure directory exists.
+        A tag is appended to the file stem (e.g. 'flash' -> name_flash.csv).
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / self.csv_file
+        if tag:
+            path = path.with_name(f"{path.stem}_{tag}{path.suffix}")
+        return path
+
+    def stream_data(self, reader, notifier):
+        """Stream thread body: log frames queued into reader by notifier until stopped.
+        do_start attaches reader/notifier before sending START; they are stopped here on exit.
+        """
+        # Keep the receive thread ahead of the CLI/driver load, and keep GC pauses
+        # out of the frame path (decode/log allocations are acyclic).
+        boost_current_thread(self.stream_cpu, self.stream_rt_priority)
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        out_path = None
         try:
             if not self.initialize_can_bus():
                 print("Failed to initialize CAN bus")
                 return
             
-            out_path = self._make_output_path()
-            print(f"Logging to: {out_path.resolve()}")
-            with open(out_path, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Timestamp', 'Pressure1', 'Pressure2'])
+            # Resolved once; reused for the open and both status messages
+            out_path = self._make_output_path().resolve()
+            print(f"Logging to: {out_path}")
+            # Raw file descriptor: rows are pre-rendered as bytes and written in
+            # batches, so neither the csv module nor Python's io buffering layers
+            # are needed here. Sessions append to an existing log instead of
+            # truncating it; the header is only written to a new/empty file.
+            fd = os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0), 0o644)
+            if os.fstat(fd).st_size == 0:
+                os.write(fd, CSV_HEADER)
+
+            # Row batches are rendered and written by a separate writer thread so
+            # disk I/O jitter never stalls frame handling. The bounded queue applies
+            # back-pressure if the disk falls far behind.
+            write_q = queue.Queue(maxsize=64)
+            # Samples are stamped with perf_counter_ns() (a cheap int, no datetime
+            # objects in the frame path); the writer maps them back to wall-clock
+            # time using this anchor taken at session start.
+            clock_offset_ns = time.time_ns() - time.perf_counter_ns()
+            writer_thread = threading.Thread(target=self._write_csv_batches,
+                                             args=(fd, write_q, clock_offset_ns), daemon=True)
+            writer_thread.start()
+            try:
                 sample_counter = 0
-                last_write_time = datetime.datetime.now()
-                write_period_s = 1.0
-                stale_after_s = 2.0
+                write_period_ns = 1_000_000_000   # write out pending rows at least once per second
 
                 # Buffer rows in memory and flush in batches to avoid slow per-row I/O.
-                buffered_rows = []
-                flush_every = 2000
+                # Rows are stored flat as (perf_counter_ns, p1, p2) triples in a
+                # C int64 array, so a batch is one contiguous buffer rather than
+                # thousands of row tuples; ISO formatting happens in the writer.
+                buffered_rows = array('q')
+                flush_every = 2000 * 3   # array items per batch (3 per sample)
+
+                def flush_rows():
+                    # Hand the whole batch to the writer and start a fresh one
+                    nonlocal buffered_rows, append_row
+                    write_q.put(buffered_rows)
+                    buffered_rows = array('q')
+                    append_row = buffered_rows.extend
 
                 frames_received = 0
-                no_msg_ticks = 0
+                idle_warn_ns = 5_000_000_000   # warn once after this long without frames
+                idle_warned = False
+
+                flush_deadline_ns = time.monotonic_ns() + write_period_ns
+                last_frame_ns = flush_deadline_ns - write_period_ns
+
+                # Bind everything the loop touches to locals (LOAD_FAST instead of
+                # attribute/global lookups at CAN frame rate)
+                sensor_index = self._sensor_index
+                append_row = buffered_rows.extend
+                unpack_u32 = _U32_BE.unpack_from
+                unpack_p1p2 = _PACKED_P1P2.unpack_from
+                unpack_2x = _PACKED_2X.unpack_from
+                monotonic_ns = time.monotonic_ns
+                perf_ns = time.perf_counter_ns
+                response_handlers = self._response_handlers
+                generic_ack = self._handle_generic_ack
+                broadcast_id = BROADCAST_ID
+                sensor_names = self.SENSOR_NAMES
+                n_sensors = len(sensor_names)
+
+                # python-can's Notifier thread owns bus.recv() for the session and
+                # queues frames into a BufferedReader; this loop only dequeues.
+                get_message = reader.get_message
+                stop_requested = self._stop_evt.is_set
+
+                # Frames already queued are drained back-to-back with non-blocking
+                # gets; the stop check, time-based flush and blocking wait only run
+                # once the queue is empty, or every drain_max frames so a constant
+                # backlog cannot hold off a stop request.
+                drain_max = 256
+                burst = 0
+
+                while True:
+                    msg = get_message(0) if burst < drain_max else None
+                    if msg is None:
+                        burst = 0
+                        if stop_requested():
+                            break
+
+                        # Time-based flush so slow streams still reach the disk promptly
+                        now_ns = monotonic_ns()
+                        if now_ns >= flush_deadline_ns:
+                            if buffered_rows:
+                                flush_rows()
+                            flush_deadline_ns = now_ns + write_period_ns
+
+                        # Block until a frame arrives or the next flush is due; a stop
+                        # request wakes this wait with a None sentinel (_stop_stream)
+                        msg = get_message((flush_deadline_ns - now_ns) / 1e9)
+                        if msg is None:
+                            # Report if we haven't seen any CAN frames for 5 seconds
+                            if not idle_warned and monotonic_ns() - last_frame_ns >= idle_warn_ns:
+                                idle_warned = True
+                                print("No CAN frames received for 5 seconds (is the module still streaming?)")
+                            continue
+                        last_frame_ns = monotonic_ns()
+                        idle_warned = False
 
-                while self.streaming:
-                    # Wake up at least every 0.1s even if no CAN messages arrive
-                    with self.bus_lock:
-                        msg = self.bus.recv(timeout=0.1)
-                    current_time = datetime.datetime.now()
+                    burst += 1
+                    frames_received += 1
+                    current_time = perf_ns()
+                    d = msg.data
+                    if len(d) != 8:
+                        continue
 
-                    handled = False
+                    # The bus filters (CAN_RX_FILTERS) only pass BROADCAST_ID and
+                    # PC_RESP_ID, so a single comparison routes every frame.
+                    if msg.arbitration_id != broadcast_id:
+                        # ACK/response frames coming back to the PC (PC_RESP_ID)
+                        response_handlers.get(d[3], generic_ack)(d)
+                        continue
 
-                    if msg is None:
-                        no_msg_ticks += 1
-                        # Report if we haven't seen any CAN frames for 5 seconds
-                        if no_msg_ticks == 50:
-                            print("No CAN frames received for 5 seconds (is the module still streaming?)")
+                    # --- Broadcast realtime frames from Tiva (ID 0x7DF) ---
+                    # Tested most-frequent first: dual-sample packed frames, then the
+                    # 1-sample packed mode, then the old per-sensor frames.
+                    frame_type = d[0]
+                    sensor_id = d[1]
+
+                    if sensor_id == 0x12 and frame_type == 0x06:
+                        # New 2-samples-per-frame mode (reduced bus load)
+                        # Frame payload (bytes 2..7) holds two 12-bit P1/P2 samples.
+                        # Layout (each sample = p1 (12b) + p2 (12b)):
+                        #   [2..4] = sample A
+                        #   [5..7] = sample B
+                        # Read the 48 bits as hi = bytes 2-3 and lo = bytes 4-7
+                        # with one Struct call, then split the four 12-bit fields.
+                        hi, lo = unpack_2x(d)
+                        p1_a = hi >> 4
+                        p2_a = ((hi & 0xF) << 8) | (lo >> 24)
+                        p1_b = (lo >> 12) & 0xFFF
+                        p2_b = lo & 0xFFF
+
+                        # Publish the newer sample as the latest value per channel
+                        self._latest = (p1_b, p2_b, current_time, current_time)
+
+                        # Buffer both samples (assume 0.5ms spacing between samples)
+                        append_row((current_time, p1_a, p2_a,
+                                    current_time + 500_000, p1_b, p2_b))
+                        sample_counter += 2
+
+                    elif sensor_id == 0x12 and frame_type == 0x05:
+                        # Legacy 1-sample-per-frame packed mode
+                        p1, p2 = unpack_p1p2(d)
+
+                        self._latest = (p1, p2, current_time, current_time)
+
+                        # Buffer each sample and flush periodically to reduce I/O overhead.
+                        append_row((current_time, p1, p2))
+                        sample_counter += 1
+
+                    # -------- OLD SINGLE SENSOR MODE (keep for safety) --------
+                    else:
+                        if frame_type in (0x05, 0x06) and (idx := sensor_index[sensor_id]) >= 0:
+                            value = unpack_u32(d, 4)[0]
+
+                            latest = list(self._latest)
+                            latest[idx] = value
+                            latest[idx + n_sensors] = current_time
+                            self._latest = tuple(latest)
+
+                            print(f"[BC] {sensor_names[idx]}: {value}")
                         continue
 
-                    no_msg_ticks = 0
-                    frames_received += 1
+                    # Flush every flush_every samples (reduce per-sample I/O overhead)
+                    if len(buffered_rows) >= flush_every:
+                        flush_rows()
 
-                    # --- Special-case: broadcast realtime frames from Tiva (ID 0x7DF) ---
-                    if msg.arbitration_id == 0x7DF and len(msg.data) == 8:
-                        frame_type = msg.data[0]
-                        sensor_id  = msg.data[1]
-
-
-                        if frame_type in (0x05, 0x06):
-
-                            # -------- NEW PACKED MODE --------
-                            if sensor_id == 0x12:   # packed P1 + P2
-                                if frame_type == 0x05:
-                                    # Legacy 1-sample-per-frame mode
-                                    p1 = (msg.data[2] << 8) | msg.data[3]
-                                    p2 = (msg.data[4] << 8) | msg.data[5]
-
-                                    with self.data_lock:
-                                        self.sensor_data['Pressure1'] = p1
-                                        self.sensor_time['Pressure1'] = current_time
-                                        self.sensor_data['Pressure2'] = p2
-                                        self.sensor_time['Pressure2'] = current_time
-
-                                    # Buffer each sample and flush periodically to reduce I/O overhead.
-                                    buffered_rows.append([current_time.isoformat(timespec="milliseconds"), p1, p2])
-                                    sample_counter += 1   # increment
-
-                                else:
-                                    # New 2-samples-per-frame mode (reduced bus load)
-                                    # Frame payload (bytes 2..7) holds two 12-bit P1/P2 samples.
-                                    # Layout (each sample = p1 (12b) + p2 (12b)):
-                                    #   [2..4] = sample A
-                                    #   [5..7] = sample B
-                                    p1_a = (msg.data[2] << 4) | (msg.data[3] >> 4)
-                                    p2_a = ((msg.data[3] & 0x0F) << 8) | msg.data[4]
-                                    p1_b = (msg.data[5] << 4) | (msg.data[6] >> 4)
-                                    p2_b = ((msg.data[6] & 0x0F) << 8) | msg.data[7]
-
-                                    with self.data_lock:
-                                        # Update latest values for each pressure channel
-                                        self.sensor_data['Pressure1'] = p1_b
-                                        self.sensor_time['Pressure1'] = current_time
-                                        self.sensor_data['Pressure2'] = p2_b
-                                        self.sensor_time['Pressure2'] = current_time
-
-                                    # Buffer both samples (assume 0.5ms spacing between samples)
-                                    buffered_rows.append([current_time.isoformat(timespec="milliseconds"), p1_a, p2_a])
-                                    buffered_rows.append([(current_time + datetime.timedelta(microseconds=500)).isoformat(timespec="milliseconds"), p1_b, p2_b])
-                                    sample_counter += 2
-
-                                # Flush every flush_every samples (reduce per-sample I/O overhead)
-                                if sample_counter % flush_every == 0:
-                                    writer.writerows(buffered_rows)
-                                    file.flush()
-                                    buffered_rows.clear()
-
-                                if sample_counter % 1000 == 0:
-                                    print(f"Logged {sample_counter} samples")
-
-                            # -------- OLD SINGLE SENSOR MODE (keep for safety) --------
-                            elif sensor_id in self.SENSOR_IDS:
-                                value = struct.unpack('>I', bytes(msg.data[4:8]))[0]
-                                name = self.SENSOR_IDS[sensor_id]
-
-                                with self.data_lock:
-                                    self.sensor_data[name] = value
-                                    self.sensor_time[name] = current_time
-
-                                print(f"[BC] {name}: {value}")
-
-                        handled = True
-
-                        # Handle ACK/response frames coming back to the PC
-                        if msg is not None and msg.arbitration_id == PC_RESP_ID and len(msg.data) == 8:
-                            cmd_id = msg.data[3]
-                            if cmd_id == self.CMD_VERSION:
-                                major, minor, patch, build = msg.data[4], msg.data[5], msg.data[6], msg.data[7]
-                                self.version = f"{major}.{minor}.{patch}.{build}"
-                                print(f"Received firmware version: {self.version}")
-
-                                # If a command is waiting for this response, wake it up
-                                if self.expected_response_cmd == cmd_id:
-                                    self.response_data = (major, minor, patch, build)
-                                    self.response_event.set()
-                            else:
-                                # Generic status/value in bytes 4..7
-                                val = (msg.data[4] << 24) | (msg.data[5] << 16) | (msg.data[6] << 8) | msg.data[7]
-                                print(f"ACK cmd={hex(cmd_id)} value={val}")
-                            continue
+                    if sample_counter % 1000 == 0:
+                        print(f"Logged {sample_counter} samples")
 
                 # Flush any remaining buffered samples before closing the file
                 if buffered_rows:
-                    writer.writerows(buffered_rows)
-                    file.flush()
-                    buffered_rows.clear()
+                    flush_rows()
 
-                # Streaming loop exited (self.streaming set to False or loop ended)
+                # Streaming loop exited (stop event set)
                 print(f"Streaming loop exited after logging {sample_counter} samples")
+            finally:
+                write_q.put(None)
+                writer_thread.join()
+                # Nothing is flushed while streaming; make the session durable
+                # once, at stop
+                try:
+                    os.fsync(fd)
+                except OSError as e:
+                    print(f"Could not sync log file: {e}")
+                os.close(fd)
 
         except Exception as e:
             print(f"Streaming error: {e}")
         finally:
-            if self.bus:
-                self.bus.shutdown()
-                self.bus = None
-            print(f"Sensor data saved to {out_path.resolve() if 'out_path' in locals() else self.csv_file}")
+            notifier.stop()
+            if gc_was_enabled:
+                gc.enable()
+            print(f"Sensor data saved to {out_path if out_path is not None else self.csv_file}")
+
+    def _write_csv_batches(self, fd, batches, clock_offset_ns):
+        """CSV writer thread: render queued row batches and write them to fd until a None sentinel.
+        Row timestamps are perf_counter_ns() values; clock_offset_ns maps them to epoch ns.
+        """
+        # Consecutive rows mostly share the same second, so the ISO date/time
+        # prefix is only rebuilt when the second changes.
+        last_sec = None
+        prefix = ''
+        done = False
+        while not done:
+            # Take every batch that is already waiting, so a backlog goes out as
+            # one writev() of per-batch buffers. The None sentinel is always
+            # queued last.
+            pending = [batches.get()]
+            while True:
+                try:
+                    pending.append(batches.get_nowait())
+                except queue.Empty:
+                    break
+            if pending[-1] is None:
+                pending.pop()
+                done = True
+
+            buffers = []
+            for batch in pending:
+                lines = []
+                append = lines.append
+                rows = iter(batch)
+                try:
+                    for t, a, b in zip(rows, rows, rows):
+                        sec, ns = divmod(t + clock_offset_ns, 1_000_000_000)
+                        if sec != last_sec:
+                            last_sec = sec
+                            prefix = datetime.datetime.fromtimestamp(sec).isoformat()
+                        append(f'{prefix}.{_MS3[ns // 1_000_000]},{_DEC[a]},{_DEC[b]}\r\n')
+                except IndexError:
+                    # A value outside the 12-bit table (legacy 0x05 frames carry
+                    # 16-bit fields): render this batch with plain formatting
+                    lines.clear()
+                    rows = iter(batch)
+                    for t, a, b in zip(rows, rows, rows):
+                        sec, ns = divmod(t + clock_offset_ns, 1_000_000_000)
+                        if sec != last_sec:
+                            last_sec = sec
+                            prefix = datetime.datetime.fromtimestamp(sec).isoformat()
+                        append('%s.%03d,%d,%d\r\n' % (prefix, ns // 1_000_000, a, b))
+                # Render the batch as one str and encode it once, rather than
+                # building and encoding a bytes object per row
+                buffers.append(''.join(lines).encode('ascii'))
+            if not buffers:
+                continue
+            try:
+                _writev_all(fd, buffers)
+            except OSError as e:
+                # Keep draining so the stream loop is never blocked on a full queue
+                print(f"CSV write error: {e}")
+
+    def _handle_version_response(self, data):
+        """Record a firmware version ACK and wake a waiting do_version."""
+        major, minor, patch, build = _VERSION_BYTES.unpack_from(data)
+        self.version = f"{major}.{minor}.{patch}.{build}"
+        print(f"Received firmware version: {self.version}")
+
+        # If a command is waiting for this response, wake it up
+        if self.expected_response_cmd == self.CMD_VERSION:
+            self.response_data = (major, minor, patch, build)
+            self.response_event.set()
+
+    def _handle_readings_ack(self, data):
+        """Report a GET_READINGS ACK like any other, except while poll_readings is
+        running, where one line per poll would flood the console.
+        The reply layout is the generic u32 status/value; the pressure values in
+        _latest come from broadcast frames only.
+        """
+        if self._poll_stop.is_set():
+            self._handle_generic_ack(data)
+
+    def _dispatch_response(self, data):
+        """Decode an 8-byte ACK payload with the handler registered for its command id."""
+        self._response_handlers.get(data[3], self._handle_generic_ack)(data)
+
+    def _handle_generic_ack(self, data):
+        """Report an ACK carrying a generic status/value in bytes 4..7."""
+        print(f"ACK cmd={hex(data[3])} value={_U32_BE.unpack_from(data, 4)[0]}")
 
     def do_version(self, arg):
         """Display the version of the sensor module firmware"""
-        # Prepare for a response (the stream thread will signal this event)
+        # Prepare for a response (the version handler will signal this event)
         self.response_event.clear()
         self.expected_response_cmd = self.CMD_VERSION
         self.response_data = None
 
-        if not self.send_command(self.CMD_VERSION):
-            print("Failed to send version request command")
-            print(f"Local version: {self.version}")
-            self.expected_response_cmd = None
-            return
+        # While streaming, the stream loop consumes CAN frames and dispatches ACKs.
+        # Otherwise nobody is reading the bus, so listen on a short-lived Notifier
+        # that is attached before the request goes out.
+        notifier = None
+        if not self.streaming and self.initialize_can_bus():
+            self._discard_pending_frames()
+            notifier = can.Notifier(self.bus, [_ResponseListener(self._dispatch_response)], timeout=0.2)
 
-        print("Version request sent to sensor module. Waiting for response...")
+        try:
+            if not self.send_command(self.CMD_VERSION):
+                print("Failed to send version request command")
+                print(f"Local version: {self.version}")
+                return
+
+            print("Version request sent to sensor module. Waiting for response...")
 
-        if self.streaming:
-            # When streaming, the stream thread is responsible for consuming CAN frames
             if self.response_event.wait(timeout=5):
-                major, minor, patch, build = self.response_data
-                self.version = f"{major}.{minor}.{patch}.{build}"
                 print(f"Sensor module firmware version: {self.version}")
             else:
                 print("No response received from sensor module. Using local version.")
                 print(f"Local version: {self.version}")
-        else:
-            # When not streaming, read directly from the bus (protected by lock)
-            try:
-                if not self.initialize_can_bus():
-                    print("Failed to initialize CAN bus")
-                    return
-
-                start_time = datetime.datetime.now()
-                timeout = 5  # seconds
-
-                while (datetime.datetime.now() - start_time).total_seconds() < timeout:
-                    with self.bus_lock:
-                        msg = self.bus.recv(1)
-
-                    if msg and msg.arbitration_id == PC_RESP_ID and len(msg.data) == 8:
-                        cmd_id = msg.data[3]
-                        if cmd_id == self.CMD_VERSION:
-                            major, minor, patch, build = msg.data[4], msg.data[5], msg.data[6], msg.data[7]
-                            self.version = f"{major}.{minor}.{patch}.{build}"
-                            print(f"Sensor module firmware version: {self.version}")
-                            return
-
-                print("No response received from sensor module. Using local version.")
-                print(f"Local version: {self.version}")
-
-            except Exception as e:
-                print(f"Error receiving version response: {e}")
-                print(f"Local version: {self.version}")
-
-        self.expected_response_cmd = None
+        finally:
+            if notifier is not None:
+                notifier.stop()
+            self.expected_response_cmd = None
 
     def do_start(self, arg):
-        """Start real-time sensor streaming"""
+        """Start real-time sensor streaming (optional: start <cpu> [rt_priority], e.g. start 3 50)"""
         if not self.streaming:
+            args = arg.split()
+            if args:
+                try:
+                    cpu = int(args[0])
+                    rt_priority = int(args[1]) if len(args) > 1 else None
+                except ValueError:
+                    print("Usage: start [<cpu> [<rt_priority>]] (e.g., start 3 50)")
+                    return
+                cpu_count = os.cpu_count() or 1
+                if not 0 <= cpu < cpu_count:
+                    print(f"CPU core must be between 0 and {cpu_count - 1}")
+                    return
+                if rt_priority is not None:
+                    if detect_os() != 'Linux':
+                        print("Real-time priority is only supported on Linux; ignoring it")
+                        rt_priority = None
+                    elif not 1 <= rt_priority <= 99:
+                        print("Real-time priority must be between 1 and 99")
+                        return
+                self.stream_cpu = cpu
+                self.stream_rt_priority = rt_priority
+
+            if not self.initialize_can_bus():
+                return
+            self._discard_pending_frames()
+            # Attach the receive pipeline before START goes out, so the first
+            # frames the module sends are already being queued
+            reader = can.BufferedReader()
+            notifier = can.Notifier(self.bus, [reader], timeout=self.stream_recv_timeout_s)
             if self.send_command(self.CMD_START_STREAM):
-                self.streaming = True
-                self.stream_thread = threading.Thread(target=self.stream_data, daemon=True)
+                self._stop_evt.clear()
+                self._stream_reader = reader
+                self.stream_thread = threading.Thread(target=self.stream_data, args=(reader, notifier),
+                                                      daemon=True)
                 self.stream_thread.start()
                 print("Started real-time streaming")
             else:
+                notifier.stop()
                 print("Failed to send start streaming command")
         else:
             print("Streaming is already active")
 
+    def _stop_stream(self):
+        """Signal the stream thread to finish, wake it if it is waiting for frames, and join it."""
+        # Readings polling only makes sense while the stream loop consumes the replies
+        self._stop_polling()
+        self._stop_evt.set()
+        reader = self._stream_reader
+        self._stream_reader = None
+        if reader is not None:
+            try:
+                reader.on_message_received(None)   # wake-up sentinel for get_message()
+            except RuntimeError:
+                pass   # reader already stopped (stream thread exited on its own)
+        if self.stream_thread:
+            self.stream_thread.join()
+
     def do_stop(self, arg):
         """Stop streaming"""
         if self.streaming:
-            if self.send_command(self.CMD_STOP_STREAM):
-                self.streaming = False
-                if self.stream_thread:
-                    self.stream_thread.join()
-                print("Stopped real-time streaming")
-            else:
-                print("Failed to send stop streaming command")
+            if not self.send_command(self.CMD_STOP_STREAM):
+                print("Failed to send stop streaming command; stopping local logging anyway")
+            self._stop_stream()
+            print("Stopped real-time streaming")
         else:
             print("Streaming is not active")
 
@@ -618,12 +1067,12 @@ Additional commands:
         """Exit the command line interface"""
         if self.streaming:
             self.send_command(self.CMD_STOP_STREAM)
-            self.streaming = False
-            if self.stream_thread:
-                self.stream_thread.join()
+            self._stop_stream()
+        self._stop_polling()
         if self.bus:
             self.bus.shutdown()
             self.bus = None
+            self._bus_channel = None
         print("Exiting Sensor Commander")
         return True
 
@@ -648,26 +1097,118 @@ Additional commands:
         else:
             print("Failed to send buffer size command")
 
+    def do_set_affinity(self, arg):
+        """Pin the streaming thread to a CPU core (e.g., set_affinity 2; 'set_affinity off' to clear)"""
+        value = arg.strip().lower()
+        if not value:
+            print(f"Stream thread CPU: {self.stream_cpu if self.stream_cpu is not None else 'any'}")
+            return
+        if value in ('off', 'none'):
+            self.stream_cpu = None
+            self.stream_rt_priority = None
+            print("Stream thread affinity and real-time priority cleared (applies from the next start)")
+            return
+
+        try:
+            cpu = int(value)
+        except ValueError:
+            print("Usage: set_affinity <core> | off (e.g., set_affinity 2)")
+            return
+
+        cpu_count = os.cpu_count() or 1
+        if not 0 <= cpu < cpu_count:
+            print(f"CPU core must be between 0 and {cpu_count - 1}")
+            return
+
+        self.stream_cpu = cpu
+        print(f"Stream thread will be pinned to CPU {cpu} (applies from the next start)")
+
     def do_readings(self, arg):
         """Display current sensor readings"""
         if self.send_command(self.CMD_GET_READINGS):
             print("Reading request sent to sensor module")
             print("Current sensor readings:")
 
-            with self.data_lock:
-                snapshot = dict(self.sensor_data)
-
-            for sensor, value in snapshot.items():
-                print(f"{sensor}: {value if value is not None else 'No data'}")
+            # One read of the published tuple is a consistent snapshot; names are
+            # only attached here
+            latest = self._latest
+            n = len(self.SENSOR_NAMES)
+            values, times = latest[:n], latest[n:]
+
+            now = time.perf_counter_ns()
+            for sensor, value, ts in zip(self.SENSOR_NAMES, values, times):
+                if value is None:
+                    print(f"{sensor}: No data")
+                    continue
+                age = (now - ts) / 1e9
+                stale = " (stale)" if age > self.stale_after_s else ""
+                print(f"{sensor}: {value} ({age:.1f} s ago){stale}")
         else:
             print("Failed to send reading request command")
 
+    def do_poll_readings(self, arg):
+        """Request readings periodically while streaming (e.g., poll_readings 0.1  OR  poll_readings stop)"""
+        arg = arg.strip().lower()
+        if arg in ('', 'stop', 'off'):
+            if not arg:
+                print("Usage: poll_readings <period_s> | stop")
+            elif self._stop_polling():
+                print("Stopped readings polling")
+            else:
+                print("Readings polling is not active")
+            return
+
+        try:
+            period = float(arg)
+        except ValueError:
+            print("Usage: poll_readings <period_s> | stop")
+            return
+        if period <= 0:
+            print("Period must be positive.")
+            return
+        # Replies are consumed by the stream loop; without it they would only
+        # pile up in the receive buffer
+        if not self.streaming:
+            print("Start streaming before polling readings.")
+            return
+
+        self._stop_polling()
+        self._poll_stop = threading.Event()
+        self._poll_thread = threading.Thread(target=self._poll_readings_loop,
+                                             args=(period, self._poll_stop), daemon=True)
+        self._poll_thread.start()
+        print(f"Requesting readings every {period} s; replies are not echoed while polling "
+              f"(polling ends with 'poll_readings stop' or when streaming stops)")
+
+    def _poll_readings_loop(self, period, stop):
+        """Send a readings request every `period` seconds until `stop` is set or a send fails."""
+        while not stop.wait(period):
+            if not self.send_command(self.CMD_GET_READINGS):
+                print("Readings polling stopped")
+                break
+
+    def _stop_polling(self):
+        """Stop readings polling and join its thread; return True if it was running."""
+        thread = self._poll_thread
+        self._poll_thread = None
+        self._poll_stop.set()
+        if thread is None or not thread.is_alive():
+            return False
+        thread.join()
+        return True
+
     def do_read_flash(self, arg):
         """Read stored flash data from the module (requires stop streaming)."""
         if self.streaming:
             print("Stop streaming before reading flash data.")
             return
 
+        if not self.initialize_can_bus():
+            print("Failed to initialize CAN bus")
+            return
+
+        self._discard_pending_frames()
+
         # The firmware streams flash data in response to the "stream buffered" command
         # (CMD_STREAM_BUFFER = 0x03). The flash playback frames are tagged as CMD_READ_FLASH
         # (0x07) in the response payload.
@@ -677,11 +1218,8 @@ Additional commands:
 
         print("Read flash request sent. Receiving stored samples...")
 
-        if not self.initialize_can_bus():
-            print("Failed to initialize CAN bus")
-            return
-
-        samples = []
+        # Raw 8-byte playback frames, decoded in one pass once reception ends
+        raw_frames = bytearray()
         record_count = None
         samples_received = 0
         start_time = datetime.datetime.now()
@@ -692,11 +1230,11 @@ Additional commands:
         received_debug_messages = 0
         while (datetime.datetime.now() - start_time).total_seconds() < timeout:
             msg = self.bus.recv(1)
-            if not msg or len(msg.data) != 8:
+            # Only replies addressed to the PC belong to this exchange
+            if not msg or msg.arbitration_id != PC_RESP_ID or len(msg.data) != 8:
                 continue
 
             cmd_id = msg.data[3]
-            value = (msg.data[4] << 24) | (msg.data[5] << 16) | (msg.data[6] << 8) | msg.data[7]
 
             # Help diagnose why the module is not responding to the flash playback request.
             # Print the first few received messages while waiting for the response.
@@ -707,7 +1245,7 @@ Additional commands:
             # First response should be the buffered-stream reply: command=CMD_STREAM_BUFFER
             # and value = number of stored records (may be 0).
             if cmd_id == self.CMD_STREAM_BUFFER:
-                record_count = value
+                record_count = _U32_BE.unpack_from(msg.data, 4)[0]
                 print(f"Flash record count: {record_count}")
                 if record_count == 0:
                     break
@@ -720,15 +1258,14 @@ Additional commands:
 
             print(f"RECV ID=0x{msg.arbitration_id:03X} cmd=0x{cmd_id:02X} data={msg.data.hex()}")
 
-            # Flash playback frames are tagged CMD_READ_FLASH and contain packed samples.
-            if cmd_id != self.CMD_READ_FLASH:
+            # Flash playback frames are tagged CMD_READ_FLASH and contain packed samples;
+            # they only count once the record count is known.
+            if cmd_id != self.CMD_READ_FLASH or record_count is None:
                 continue
 
             # Collect up to record_count samples (don't treat value==0 as terminator)
             if samples_received < record_count:
-                p1 = (value >> 16) & 0xFFFF
-                p2 = value & 0xFFFF
-                samples.append((p1, p2))
+                raw_frames += msg.data
                 samples_received += 1
 
             # Stop when we've collected the expected number of samples
@@ -746,41 +1283,51 @@ Additional commands:
         if samples_received != record_count:
             print(f"Warning: expected {record_count} samples but received {samples_received}.")
 
+        # Decode every buffered frame in a single C-level pass
+        samples = list(_FLASH_SAMPLE.iter_unpack(raw_frames))
+
         if samples:
-            out_path = self._make_output_path()
-            with open(out_path, mode='w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Timestamp', 'Pressure1', 'Pressure2'])
-                now = datetime.datetime.now()
-                for i, (p1, p2) in enumerate(samples):
-                    writer.writerow([now.isoformat(timespec="milliseconds"), p1, p2])
-            print(f"Saved {len(samples)} samples to {out_path.resolve()}")
+            # Separate file: a dump replaces the previous one, while the stream
+            # log accumulates sessions
+            out_path = self._make_output_path('flash').resolve()
+            # Render the whole file up front and write it through a raw fd, like
+            # the stream log (no csv module or io buffering layers)
+            now = datetime.datetime.now().isoformat(timespec="milliseconds")
+            data = CSV_HEADER + ''.join(['%s,%d,%d\r\n' % (now, p1, p2)
+                                         for p1, p2 in samples]).encode('ascii')
+            fd = os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+            try:
+                _write_all(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            print(f"Saved {len(samples)} samples to {out_path}")
         else:
             print("No stored samples received (timeout or empty record)")
         
-    def default(self, line):
-        """Handle numbered commands"""
-        if line in self.COMMAND_MAP:
-            # Get the corresponding command method
-            cmd_name = self.COMMAND_MAP[line]
-            cmd_method = getattr(self, f'do_{cmd_name}')
+    def onecmd(self, line):
+        """Handle numbered commands straight from the bound table; everything else goes through cmd.Cmd.
+        (cmd.Cmd would first try getattr(self, 'do_<n>') and fail over to default().)
+        """
+        cmd_method = self._dispatch.get(line.strip())
+        if cmd_method is not None:
+            self.lastcmd = line
             # Call the method with empty arguments
             return cmd_method('')
-        else:
-            return super().default(line)
+        return super().onecmd(line)
             
     def do_set_channel(self, arg):
         """Set the COM port for the CANable interface (e.g., 'set_channel COM8')"""
         global CAN_CHANNEL
         if arg:
-            # Close existing connection if any
-            if self.bus:
-                self.bus.shutdown()
-                self.bus = None
-                
-            # Update the global channel
+            if self.streaming:
+                print("Stop streaming before changing the CAN channel.")
+                return
+
+            # Update the global channel (initialize_can_bus reopens the bus on change)
             CAN_CHANNEL = arg.strip()
             print(f"CAN channel set to {CAN_CHANNEL}")
+            _save_port(CAN_CHANNEL)
             
             # Try to initialize with the new channel
             if self.initialize_can_bus():
@@ -795,20 +1342,21 @@ Additional commands:
     def do_scan_ports(self, arg):
         """Scan for available CAN interface ports and allow selection"""
         global CAN_CHANNEL
+        if self.streaming:
+            print("Stop streaming before changing the CAN channel.")
+            return
         old = CAN_CHANNEL
-        new = select_can_port()
+        # An explicit scan should see adapters plugged in since the last one
+        new = select_can_port(rescan=True)
         if new and new != old:
-            if self.bus:
-                self.bus.shutdown()
-                self.bus = None
             print("Port changed — reconnecting on next CAN action.")
     
     def do_system_info(self, arg):
         """Display system information and available ports"""
         print(f"\nSystem Information:")
         print(f"Operating System: {detect_os()}")
-        print(f"Platform: {platform.platform()}")
-        print(f"Python Version: {platform.python_version()}")
+        print(f"Platform: {_PLATFORM}")
+        print(f"Python Version: {_PYV}")
         print(f"Current CAN Channel: {CAN_CHANNEL or 'Not configured'}")
         
         print(f"\nScanning for serial ports...")
@@ -819,33 +1367,33 @@ Additional commands:
             return
         
         # Separate CAN devices from other ports
-        can_ports = [p for p in ports if p['is_can_device']]
-        other_ports = [p for p in ports if not p['is_can_device']]
+        can_ports = [p for p in ports if p.is_can_device]
+        other_ports = [p for p in ports if not p.is_can_device]
         
         if can_ports:
             print(f"\nDetected CAN Interface Devices ({len(can_ports)}):")
             print("-" * 50)
             for port in can_ports:
-                print(f"  Port: {port['device']}")
-                print(f"  Description: {port['description']}")
-                if port['manufacturer']:
-                    print(f"  Manufacturer: {port['manufacturer']}")
-                if port['vid_pid'] != ':':
-                    print(f"  VID:PID: {port['vid_pid']}")
-                if port['serial_number']:
-                    print(f"  Serial: {port['serial_number']}")
+                print(f"  Port: {port.device}")
+                print(f"  Description: {port.description}")
+                if port.manufacturer:
+                    print(f"  Manufacturer: {port.manufacturer}")
+                if port.vid_pid:
+                    print(f"  VID:PID: {port.vid_pid}")
+                if port.serial_number:
+                    print(f"  Serial: {port.serial_number}")
                 print()
         
         if other_ports:
             print(f"Other Serial Ports ({len(other_ports)}):")
             print("-" * 50)
             for port in other_ports:
-                print(f"  Port: {port['device']}")
-                print(f"  Description: {port['description']}")
-                if port['manufacturer']:
-                    print(f"  Manufacturer: {port['manufacturer']}")
-                if port['vid_pid'] != ':':
-                    print(f"  VID:PID: {port['vid_pid']}")
+                print(f"  Port: {port.device}")
+                print(f"  Description: {port.description}")
+                if port.manufacturer:
+                    print(f"  Manufacturer: {port.manufacturer}")
+                if port.vid_pid:
+                    print(f"  VID:PID: {port.vid_pid}")
                 print()
     
     def do_help(self, arg):
@@ -857,8 +1405,7 @@ Additional commands:
             # Display general help with numbered commands
             print("Available commands:")
             print("  Command Numbers:")
-            for num, cmd in self.COMMAND_MAP.items():
-                method = getattr(self, f'do_{cmd}')
+            for num, method in self._dispatch.items():
                 doc = method.__doc__ or ''
                 print(f"  {num} - {doc.strip()}")
             print("\n  Commands:")
@@ -871,4 +1418,9 @@ Additional commands:
                     print(f"  {cmd} - {doc.strip()}")
 
 if __name__ == '__main__':
+    # --scan: pick the port interactively instead of reusing the saved one
+    # --auto: like --scan, but take the only detected CAN device without asking
+    args = sys.argv[1:]
+    if '--scan' in args or '--auto' in args:
+        select_can_port(auto='--auto' in args)
     CANBusCommander().cmdloop()